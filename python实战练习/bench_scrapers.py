@@ -0,0 +1,241 @@
+# 爬虫离线性能测试：先 record 录一次真实响应，之后用本地服务器回放，测 抓取+解析+写文件 整条流程
+# 用法：
+#   pip install -r requirements.txt
+#   python bench_scrapers.py record [名字...]             # 联网录制响应到 benchmarks/fixtures，默认全部
+#   pytest test_bench_scrapers.py --benchmark-autosave --save-mem-baseline   # 回放，存时间基线和内存基线
+#   pytest test_bench_scrapers.py --benchmark-compare --benchmark-compare-fail=min:20% --mem-tolerance 0.2
+#                                                         # 和基线比，最快一轮慢20%或者峰值内存多20%就失败
+#   pytest test_bench_scrapers.py --latency 50 --bandwidth 512   # 模拟50ms延迟、512KB/s带宽
+# 所有东西都放在 benchmarks/ 下面，都要提交到git：
+#   benchmarks/fixtures/         录下来的响应，录一次以后回放都用它
+#   benchmarks/timings/          pytest-benchmark存的时间基线(conftest.py 把 --benchmark-storage 默认指到这里)
+#   benchmarks/mem_baseline.json 峰值内存基线
+#   时间和内存跟机器有关，基线要在拿来比较的那台机器上存
+# pytest 要在这个目录里跑，或者命令行带上 test_bench_scrapers.py 的路径，不然 conftest.py 改不了存储位置
+# 注意：12306.py 里的出发日期(start_time)和Cookie是写死的，过期了票的接口就拿不到数据，
+#       录 12306 之前先把日期改成今天以后、Cookie换成浏览器里新的
+import http.server
+import io
+import json
+import multiprocessing
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from urllib.parse import quote, unquote
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(HERE, 'benchmarks')
+FIXTURE_DIR = os.path.join(BENCH_DIR, 'fixtures')
+TIMING_DIR = os.path.join(BENCH_DIR, 'timings')
+MEM_BASELINE_FILE = os.path.join(BENCH_DIR, 'mem_baseline.json')
+
+# 名字: (脚本路径, 录制时最多请求几次(None不限), 跑完应该写出来的文件(None就是只print))
+SCRAPERS = {
+    'douban': ('施耐德/Excel自动化/爬取豆瓣电影.py', None, 'templates/豆瓣rank.xlsx'),
+    'ssq': ('彩票信息.py', None, 'templates/dcs.xlsx'),
+    'nba': ('nba数据.py', None, 'templates/nba_对齐数据.txt'),
+    '12306': ('12306.py', None, None),
+    'wallpaper': ('壁纸.py', None, 'templates/壁纸/壁纸2.jpg'),
+    'xiaoshuo': ('xiaoshuo.py', 20, 'templates/斗罗大陆.txt'),  # 小说几百章，录前20章就够测了
+}
+
+
+class StopScraper(Exception):
+    # 录满了 或者 回放时没有对应的fixture，就让脚本提前结束
+    pass
+
+
+def fixture_path(name, fixture_dir=None):
+    return os.path.join(fixture_dir or FIXTURE_DIR, name)
+
+
+def has_fixture(name):
+    return os.path.exists(os.path.join(fixture_path(name), 'index.json'))
+
+
+def load_index(name, fixture_dir=None):
+    # index.json: {"requests": 脚本一共发了几次请求, "urls": {url: 响应的文件和头}}
+    with open(os.path.join(fixture_path(name, fixture_dir), 'index.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run_script(name, fake_get):
+    # 在临时目录里跑脚本，写出来的文件不会覆盖 templates 里的真实数据
+    # 返回脚本有没有跑完：该写的文件写出来了，只print的脚本就看有没有输出
+    script, _, output = SCRAPERS[name]
+    work_dir = tempfile.mkdtemp(prefix=f'bench_{name}_')
+    os.makedirs(os.path.join(work_dir, 'templates', '壁纸'))
+    old_dir = os.getcwd()
+    old_get = requests.get
+    requests.get = fake_get
+    os.chdir(work_dir)
+    out = io.StringIO()
+    try:
+        with redirect_stdout(out):
+            runpy.run_path(os.path.join(HERE, script), run_name='__main__')
+    except (StopScraper, SystemExit):
+        pass
+    finally:
+        os.chdir(old_dir)
+        requests.get = old_get
+        if output is None:
+            done = bool(out.getvalue().strip())
+        else:
+            done = os.path.exists(os.path.join(work_dir, output))
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return done
+
+
+def record(name):
+    # 联网跑一遍脚本，把每个请求的响应存下来，按url建索引
+    limit = SCRAPERS[name][1]
+    # 先录到临时目录，录成功了才替换旧的fixture
+    out_dir = fixture_path(name) + '.tmp'
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    index = {'requests': 0, 'urls': {}}
+    real_get = requests.get
+
+    def recording_get(url, **kwargs):
+        if limit is not None and index['requests'] >= limit:
+            raise StopScraper()
+        resp = real_get(url, **kwargs)
+        index['requests'] += 1
+        # 同一个url请求了好几次(比如重试)就只存第一次的响应
+        if url not in index['urls']:
+            file_name = f'{len(index["urls"]):04d}.bin'
+            with open(os.path.join(out_dir, file_name), 'wb') as f:
+                f.write(resp.content)
+            index['urls'][url] = {
+                'file': file_name,
+                'status': resp.status_code,
+                'content_type': resp.headers.get('Content-Type', 'application/octet-stream'),
+            }
+        return resp
+
+    try:
+        if not run_script(name, recording_get):
+            raise RuntimeError('脚本没有跑完，看看网站是不是改版了或者被反爬了')
+    except Exception:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise
+    with open(os.path.join(out_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(fixture_path(name), ignore_errors=True)
+    os.rename(out_dir, fixture_path(name))
+    return index['requests']
+
+
+class ReplayHandler(http.server.BaseHTTPRequestHandler):
+    # 路径格式 /<爬虫名>/<url编码后的原始url>
+    chunk_size = 16 * 1024
+
+    def do_GET(self):
+        name, _, url = self.path[1:].partition('/')
+        entry = self.server.indexes.get(name, {}).get(unquote(url))
+        if entry is None:
+            self.send_error(404)
+            return
+        with open(os.path.join(fixture_path(name, self.server.fixture_dir), entry['file']), 'rb') as f:
+            body = f.read()
+        time.sleep(self.server.latency)
+        self.send_response(entry['status'])
+        self.send_header('Content-Type', entry['content_type'])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        for i in range(0, len(body), self.chunk_size):
+            chunk = body[i:i + self.chunk_size]
+            if self.server.bandwidth:
+                time.sleep(len(chunk) / self.server.bandwidth)
+            self.wfile.write(chunk)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(fixture_dir, latency_ms, bandwidth_kb, port_queue):
+    # 在单独的进程里跑，不和被测的爬虫抢GIL，也不算进爬虫的内存；index启动时读一次
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ReplayHandler)
+    server.fixture_dir = fixture_dir
+    server.indexes = {}
+    for name in os.listdir(fixture_dir) if os.path.isdir(fixture_dir) else []:
+        if os.path.exists(os.path.join(fixture_dir, name, 'index.json')):
+            server.indexes[name] = load_index(name, fixture_dir)['urls']
+    server.latency = latency_ms / 1000
+    server.bandwidth = bandwidth_kb * 1024
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server(latency_ms=0, bandwidth_kb=0):
+    # 返回 (进程, 端口)，用完 process.terminate()
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(FIXTURE_DIR, latency_ms, bandwidth_kb, port_queue),
+                                      daemon=True)
+    process.start()
+    return process, port_queue.get(timeout=10)
+
+
+def replay_once(name, port, trace_memory=False):
+    # 回放跑一次脚本，返回 请求数、字节数、峰值内存；没跑完就报错
+    index = load_index(name)
+    real_get = requests.get
+    stats = {'requests': 0, 'bytes': 0, 'peak': 0}
+
+    def replay_get(url, **kwargs):
+        # 和录制时一样，请求次数到了或者没录过这个url，脚本就到此为止
+        if stats['requests'] >= index['requests'] or url not in index['urls']:
+            raise StopScraper()
+        kwargs.pop('verify', None)
+        resp = real_get(f'http://127.0.0.1:{port}/{name}/{quote(url, safe="")}', **kwargs)
+        stats['requests'] += 1
+        stats['bytes'] += len(resp.content)
+        return resp
+
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        done = run_script(name, replay_get)
+    finally:
+        if trace_memory:
+            stats['peak'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    if stats['requests'] != index['requests']:
+        raise RuntimeError(f'{name}: 只请求了{stats["requests"]}/{index["requests"]}次，脚本中途停了')
+    if not done:
+        raise RuntimeError(f'{name}: 脚本没有写出结果 {SCRAPERS[name][2] or "(stdout)"}')
+    return stats
+
+
+def check_mem(name, peak_kb, baseline, tolerance):
+    # 峰值内存超过基线(1+tolerance)倍就报错，没有基线就不比
+    if name in baseline and peak_kb > baseline[name]['peak_kb'] * (1 + tolerance):
+        raise AssertionError(f'{name} 峰值内存 {baseline[name]["peak_kb"]}KB -> {peak_kb}KB')
+
+
+def main():
+    names = sys.argv[2:] or list(SCRAPERS)
+    if sys.argv[1:2] != ['record'] or any(n not in SCRAPERS for n in names):
+        print('用法：python bench_scrapers.py record [' + ' '.join(SCRAPERS) + ']')
+        sys.exit(2)
+    failed = []
+    for name in names:
+        try:
+            print(f'{name}: 录了{record(name)}个响应')
+        except Exception as e:
+            print(f'{name}: 录制失败，跳过：{e!r}')
+            failed.append(name)
+    if failed:
+        print('这些没录成功：', ' '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+import bench_scrapers
+
+# 每个爬虫的吞吐量和内存，测完在终端汇总里打出来
+REPORT_KEY = pytest.StashKey[list]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench_scrapers', '爬虫回放测试')
+    group.addoption('--latency', type=float, default=0, help='回放服务器每个请求的延迟(毫秒)')
+    group.addoption('--bandwidth', type=float, default=0, help='回放服务器带宽(KB/s)，0表示不限速')
+    group.addoption('--bench-rounds', type=int, default=5, help='每个爬虫计时跑几轮(另外还有1轮预热)')
+    group.addoption('--save-mem-baseline', action='store_true', help='把这次的峰值内存存成基线')
+    group.addoption('--mem-tolerance', type=float, default=0.2, help='峰值内存允许比基线多多少，0.2就是20%%')
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # 时间基线和内存基线放在一起，没指定 --benchmark-storage 就存到 benchmarks/timings
+    if config.getoption('benchmark_storage', None) == 'file://./.benchmarks':
+        config.option.benchmark_storage = 'file://' + bench_scrapers.TIMING_DIR
+    config.stash[REPORT_KEY] = []
+
+
+@pytest.fixture(scope='session')
+def replay_server(pytestconfig):
+    # 整个session共用一个回放服务器进程，返回端口
+    process, port = bench_scrapers.start_server(pytestconfig.getoption('latency'),
+                                                pytestconfig.getoption('bandwidth'))
+    yield port
+    process.terminate()
+    process.join()
+
+
+@pytest.fixture(scope='session')
+def scraper_report(pytestconfig):
+    return pytestconfig.stash[REPORT_KEY]
+
+
+@pytest.fixture(scope='session')
+def mem_baseline(pytestconfig):
+    # 峰值内存基线：pytest-benchmark只比时间，内存自己存一个json来比
+    baseline = {}
+    if os.path.exists(bench_scrapers.MEM_BASELINE_FILE):
+        with open(bench_scrapers.MEM_BASELINE_FILE, encoding='utf-8') as f:
+            baseline = json.load(f)
+    results = {}
+    yield baseline, results
+    if pytestconfig.getoption('save_mem_baseline') and results:
+        baseline.update(results)
+        os.makedirs(bench_scrapers.BENCH_DIR, exist_ok=True)
+        with open(bench_scrapers.MEM_BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    # pytest-benchmark的表格只有时间，这里把吞吐量和内存也打出来
+    rows = config.stash.get(REPORT_KEY, [])
+    if not rows:
+        return
+    terminalreporter.section('爬虫吞吐量和峰值内存')
+    for name, info in rows:
+        terminalreporter.write_line(
+            f'{name:<10}{info["requests"]}个请求  {info["req_per_s"]}次/s  '
+            f'{info["kb_per_s"]}KB/s  峰值内存{info["peak_kb"]}KB')
@@ -0,0 +1,114 @@
+import time
+
+import pytest
+import requests
+
+import bench_scrapers
+from bench_scrapers import SCRAPERS, check_mem, has_fixture, record, replay_once, start_server
+
+
+@pytest.mark.parametrize('name', list(SCRAPERS))
+def test_scraper(name, benchmark, replay_server, mem_baseline, scraper_report, pytestconfig):
+    if not has_fixture(name):
+        pytest.skip(f'没有{name}的fixture，先跑 python bench_scrapers.py record {name}')
+
+    # 先预热一轮，import pandas/lxml 之类的开销不算进计时；回放没跑完会直接报错
+    stats = benchmark.pedantic(replay_once, args=(name, replay_server), warmup_rounds=1,
+                               rounds=pytestconfig.getoption('bench_rounds'), iterations=1)
+    # tracemalloc会拖慢速度，所以单独多跑一轮测内存
+    peak_kb = round(replay_once(name, replay_server, trace_memory=True)['peak'] / 1024, 1)
+
+    # --benchmark-disable 时没有计时结果，只做跑完和内存的检查
+    if benchmark.stats is not None:
+        fastest = benchmark.stats.stats.min
+        info = {
+            'requests': stats['requests'],
+            'req_per_s': round(stats['requests'] / fastest, 2),
+            'kb_per_s': round(stats['bytes'] / 1024 / fastest, 2),
+            'peak_kb': peak_kb,
+        }
+        benchmark.extra_info.update(info)
+        scraper_report.append((name, info))
+
+    baseline, results = mem_baseline
+    results[name] = {'peak_kb': peak_kb}
+    if not pytestconfig.getoption('save_mem_baseline'):
+        check_mem(name, peak_kb, baseline, pytestconfig.getoption('mem_tolerance'))
+
+
+# 下面几个不联网，用一个假的爬虫脚本测录制/回放这一套本身
+DEMO_SCRIPT = '''import requests
+pages = [requests.get(f'http://demo.test/{i}').text for i in (1, 2, 1, 3)]
+if '{stop}' == 'yes':
+    exit()
+with open('templates/demo.txt', 'w', encoding='utf-8') as f:
+    f.write(' '.join(pages))
+print('done')
+'''
+
+
+def fake_get(url, **kwargs):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.headers['Content-Type'] = 'text/plain; charset=utf-8'
+    resp._content = f'page-{url.rsplit("/", 1)[1]}'.encode()
+    return resp
+
+
+@pytest.fixture
+def demo(tmp_path, monkeypatch):
+    script = tmp_path / 'demo.py'
+    script.write_text(DEMO_SCRIPT.replace('{stop}', 'no'), encoding='utf-8')
+    monkeypatch.setattr(bench_scrapers, 'FIXTURE_DIR', str(tmp_path / 'fixtures'))
+    monkeypatch.setitem(SCRAPERS, 'demo', (str(script), None, 'templates/demo.txt'))
+    real_get = requests.get
+    monkeypatch.setattr(requests, 'get', fake_get)
+    assert record('demo') == 4
+    monkeypatch.setattr(requests, 'get', real_get)
+    process, port = start_server()
+    yield script, port
+    process.terminate()
+    process.join()
+
+
+def test_record_and_replay(demo):
+    script, port = demo
+    index = bench_scrapers.load_index('demo')
+    assert index['requests'] == 4
+    assert sorted(index['urls']) == ['http://demo.test/1', 'http://demo.test/2', 'http://demo.test/3']
+    # 重复请求的 /1 不能把别的url的响应文件覆盖掉
+    for url, entry in index['urls'].items():
+        body = (script.parent / 'fixtures' / 'demo' / entry['file']).read_text(encoding='utf-8')
+        assert body == 'page-' + url[-1]
+    stats = replay_once('demo', port)
+    assert stats['requests'] == 4
+    assert stats['bytes'] == len('page-1') * 4
+
+
+def test_replay_fails_when_script_stops_early(demo):
+    script, port = demo
+    script.write_text(DEMO_SCRIPT.replace('{stop}', 'yes'), encoding='utf-8')
+    with pytest.raises(RuntimeError, match='没有写出结果'):
+        replay_once('demo', port)
+
+
+def test_replay_throttling(demo):
+    process, port = start_server(latency_ms=200, bandwidth_kb=0.01)
+    try:
+        start = time.perf_counter()
+        resp = requests.get(f'http://127.0.0.1:{port}/demo/http%3A%2F%2Fdemo.test%2F1')
+        used = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.join()
+    assert resp.text == 'page-1'
+    # 200ms延迟 + 6字节按10.24字节/秒传
+    assert used >= 0.2 + 6 / 10.24 * 0.9
+
+
+def test_check_mem():
+    baseline = {'demo': {'peak_kb': 100}}
+    check_mem('demo', 119, baseline, 0.2)
+    check_mem('other', 1000, baseline, 0.2)
+    with pytest.raises(AssertionError):
+        check_mem('demo', 121, baseline, 0.2)